@@ -3,14 +3,21 @@
 営業向けセキュリティ診断支援ツール
 """
 
+import functools
+import io
 import os
+import re
 import sys
 from pathlib import Path
 import logging
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
 from datetime import datetime
 
 import streamlit as st
-import pandas as pd
 from dotenv import load_dotenv
 
 # プロジェクトルートをパスに追加
@@ -19,6 +26,23 @@ sys.path.append(str(Path(__file__).parent))
 from src.document_processor import DocumentProcessor, process_directory
 from src.vector_database import VectorDatabase, build_database_from_directory
 
+# pandasは読み込みに数百msかかるため、初回利用時まで遅延読み込みする
+@functools.lru_cache(maxsize=1)
+def _pd():
+    """pandasモジュールを遅延読み込みして返す"""
+    import pandas
+
+    return pandas
+
+
+# 高速CSV/Excelリーダー（任意依存。未インストール時はpandasにフォールバック）
+try:
+    import polars as pl
+
+    _HAVE_POLARS = True
+except ImportError:
+    _HAVE_POLARS = False
+
 # 環境変数の読み込み
 load_dotenv()
 
@@ -31,6 +55,7 @@ VECTORDB_PATH = os.getenv("VECTORDB_PATH", "./vectordb")
 RAW_DATA_DIR = os.getenv("RAW_DATA_DIR", "./data/raw")
 PROCESSED_DATA_DIR = os.getenv("PROCESSED_DATA_DIR", "./data/processed")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chromadb")  # chromadb または hnswlib
 
 # ページ設定
 st.set_page_config(
@@ -40,21 +65,72 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# 履歴の列定義（列ごとの並列リストで保持し、DataFrame化を列数分の参照渡しで済ませる）
+_HISTORY_COLUMNS = (
+    "タイムスタンプ",
+    "処理モード",
+    "入力元",
+    "検索クエリ",
+    "マッチした質問",
+    "回答",
+    "類似度",
+    "出典",
+)
+
+
+def _new_history() -> dict:
+    """空の履歴バッファ（列ごとの並列リスト）を作成"""
+    return {col: [] for col in _HISTORY_COLUMNS}
+
+
+def _append_history(row: dict):
+    """履歴バッファに1行追加（未指定の列は空文字で埋める）"""
+    for col in _HISTORY_COLUMNS:
+        st.session_state.qa_history[col].append(row.get(col, ""))
+
+
+def _extend_history(rows: list):
+    """履歴バッファに複数行を一括追加
+
+    バッチ検索のように行数が多い場合、1行ずつのappendではなく
+    列ごとに1回のextendで済ませる（session_stateへのアクセスも列数分だけ）。
+    """
+    for col in _HISTORY_COLUMNS:
+        st.session_state.qa_history[col].extend(row.get(col, "") for row in rows)
+
+
 # セッション状態の初期化
-if "vectordb" not in st.session_state:
-    st.session_state.vectordb = None
 if "qa_history" not in st.session_state:
-    st.session_state.qa_history = []
+    st.session_state.qa_history = _new_history()
+
+
+@st.cache_resource
+def _load_vectordb(persist_directory: str, embedding_model: str, backend: str):
+    """ベクトルDBを読み込む
+
+    st.cache_resourceにより、埋め込みモデルとDBクライアントは
+    同一プロセス内の全セッションで共有される（セッションごとの再読み込みを回避）。
+
+    VECTOR_BACKEND=hnswlib を指定すると、ChromaDBの代わりにインプロセスの
+    hnswlibインデックスを使用する（小規模コーパスでは追加・検索とも高速。
+    hnswlibの導入が必要、src/hnsw_database.py参照）。
+    """
+    if backend == "hnswlib":
+        from src.hnsw_database import HnswVectorDatabase
+
+        return HnswVectorDatabase(
+            persist_directory=persist_directory, embedding_model=embedding_model
+        )
+
+    return VectorDatabase(
+        persist_directory=persist_directory, embedding_model=embedding_model
+    )
 
 
 def init_vectordb():
     """ベクトルデータベースの初期化"""
-    if st.session_state.vectordb is None:
-        with st.spinner("データベースを読み込み中..."):
-            st.session_state.vectordb = VectorDatabase(
-                persist_directory=VECTORDB_PATH, embedding_model=EMBEDDING_MODEL
-            )
-    return st.session_state.vectordb
+    with st.spinner("データベースを読み込み中..."):
+        return _load_vectordb(VECTORDB_PATH, EMBEDDING_MODEL, VECTOR_BACKEND)
 
 
 def main():
@@ -132,8 +208,175 @@ def single_question_tab(vectordb: VectorDatabase):
         top_k = st.slider("検索結果数", 1, 10, 3)
         score_threshold = st.slider("類似度閾値", 0.0, 1.0, 0.5, 0.05)
 
+        # ChromaDBはsearch_efをコレクション作成時にしか設定できないため、
+        # スライダーは動的に変更できるhnswlibバックエンドのみで表示する
+        ef_search = None
+        if VECTOR_BACKEND == "hnswlib":
+            ef_search = st.slider(
+                "検索精度 (ef_search)",
+                16,
+                256,
+                64,
+                help="HNSW探索の候補数。大きいほど高精度ですが検索が遅くなります",
+            )
+
     if st.button("🔍 検索", type="primary", disabled=not query):
-        search_and_display(vectordb, query, top_k, score_threshold)
+        search_and_display(vectordb, query, top_k, score_threshold, ef_search)
+
+
+# テキスト分割用のプリコンパイル済みパターン
+_PARA_SPLIT = re.compile(r"\n{2,}")
+_LINE_SPLIT = re.compile(r"\n")
+
+
+def _extract_lines(text: str, min_len: int = 0) -> list:
+    """テキストを行単位に分割し、min_lenより長い行のみ返す"""
+    return [line.strip() for line in _LINE_SPLIT.split(text) if len(line.strip()) > min_len]
+
+
+def _extract_paragraphs(text: str, min_len: int = 20) -> list:
+    """テキストを空行区切りの段落に分割
+
+    段落が見つからない場合は行単位の分割にフォールバックする。
+    """
+    parts = [p.strip() for p in _PARA_SPLIT.split(text) if len(p.strip()) > min_len]
+    return parts or _extract_lines(text, min_len)
+
+
+def _extract_pdf_text(pdf_source) -> str:
+    """PDFの全ページからテキストを抽出して結合
+
+    ページごとの文字列を+=で連結するとO(n^2)になるため、
+    リストに集めてjoinで一括結合する。
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_source)
+    parts = [page.extract_text() or "" for page in reader.pages]
+    return "\n".join(parts)
+
+
+def _questions_from_frame(df, processing_mode: str) -> list:
+    """DataFrameから処理モードに応じて質問リストを抽出"""
+    st.write("📄 ファイルプレビュー:")
+    st.dataframe(df.head())
+
+    if processing_mode == "質問リスト処理":
+        question_col = st.selectbox("質問が含まれる列を選択", df.columns)
+        if question_col:
+            return df[question_col].dropna().astype(str).tolist()
+        return []
+
+    st.info("資料チェックモード: 全列のテキストを抽出して段落としてチェックします")
+    # to_string()のPythonフォーマッタを通さず、セル値を直接走査
+    cells = df.astype(str).to_numpy().ravel()
+    return [s.strip() for s in cells if len(s.strip()) > 20]
+
+
+def _extract_csv_questions(uploaded_file, processing_mode: str) -> list:
+    """CSVファイルから質問リストを抽出"""
+    # polarsがあればマルチスレッドのRustパーサを使用
+    # （読み込みに失敗した場合はpandasにフォールバック）
+    df = None
+    if _HAVE_POLARS:
+        try:
+            df = pl.read_csv(uploaded_file).to_pandas()
+        except Exception as e:
+            logger.warning(f"polarsでのCSV読み込みに失敗、pandasを使用します: {str(e)}")
+            uploaded_file.seek(0)
+    if df is None:
+        df = _pd().read_csv(uploaded_file)
+    return _questions_from_frame(df, processing_mode)
+
+
+def _extract_excel_questions(uploaded_file, processing_mode: str) -> list:
+    """Excelファイルから質問リストを抽出"""
+    # polarsのread_excelは別途fastexcelの導入が必要なため、
+    # 無い環境ではpandas（openpyxl）にフォールバックする
+    df = None
+    if _HAVE_POLARS:
+        try:
+            df = pl.read_excel(uploaded_file).to_pandas()
+        except Exception as e:
+            logger.warning(f"polarsでのExcel読み込みに失敗、pandasを使用します: {str(e)}")
+            uploaded_file.seek(0)
+    if df is None:
+        df = _pd().read_excel(uploaded_file)
+    return _questions_from_frame(df, processing_mode)
+
+
+@st.cache_data(max_entries=16)
+def _parse_upload_cached(file_bytes: bytes, extension: str):
+    """アップロードファイルのパース結果をファイル内容をキーにメモ化
+
+    スライダー操作のたびにStreamlitはスクリプト全体を再実行するため、
+    同じファイルが何度もパースされる。ヒット時は数秒のPDF/Wordパースが
+    ハッシュ照合1回になる。列選択ウィジェットを含むCSV/Excelは対象外。
+
+    Returns:
+        PDF/テキストは全文文字列、Wordは段落リスト
+    """
+    if extension == ".pdf":
+        return _extract_pdf_text(io.BytesIO(file_bytes))
+    if extension == ".docx":
+        from docx import Document as DocxDocument
+
+        doc = DocxDocument(io.BytesIO(file_bytes))
+        return [para.text.strip() for para in doc.paragraphs if para.text.strip()]
+    # .txt
+    return file_bytes.decode("utf-8", errors="ignore")
+
+
+def _extract_pdf_questions(uploaded_file, processing_mode: str) -> list:
+    """PDFファイルから質問リストを抽出"""
+    full_text = _parse_upload_cached(bytes(uploaded_file.getbuffer()), ".pdf")
+
+    st.write("📄 抽出されたテキスト（最初の500文字）:")
+    st.text(full_text[:500] + "...")
+
+    if processing_mode == "質問リスト処理":
+        # 行単位で分割
+        return _extract_lines(full_text, 10)
+    # 段落単位で分割
+    return _extract_paragraphs(full_text)
+
+
+def _extract_docx_questions(uploaded_file, processing_mode: str) -> list:
+    """Wordファイルから質問リストを抽出"""
+    paragraphs_text = _parse_upload_cached(bytes(uploaded_file.getbuffer()), ".docx")
+
+    st.write(f"📄 抽出された段落数: {len(paragraphs_text)}")
+    if paragraphs_text:
+        st.write("最初の段落:")
+        st.text(paragraphs_text[0][:300] + "...")
+
+    if processing_mode == "質問リスト処理":
+        return paragraphs_text
+    # 長い段落のみ（20文字以上）
+    return [p for p in paragraphs_text if len(p) > 20]
+
+
+def _extract_txt_questions(uploaded_file, processing_mode: str) -> list:
+    """テキストファイルから質問リストを抽出"""
+    content = _parse_upload_cached(bytes(uploaded_file.getbuffer()), ".txt")
+
+    st.write(f"📄 ファイル内容（最初の500文字）:")
+    st.text(content[:500] + "...")
+
+    if processing_mode == "質問リスト処理":
+        return _extract_lines(content)
+    return _extract_paragraphs(content)
+
+
+# 拡張子ごとの抽出関数テーブル（elifの連鎖を置き換えるディスパッチ）
+_EXTRACTORS = {
+    ".csv": _extract_csv_questions,
+    ".xlsx": _extract_excel_questions,
+    ".xls": _extract_excel_questions,
+    ".pdf": _extract_pdf_questions,
+    ".docx": _extract_docx_questions,
+    ".txt": _extract_txt_questions,
+}
 
 
 def batch_question_tab(vectordb: VectorDatabase):
@@ -170,7 +413,7 @@ def batch_question_tab(vectordb: VectorDatabase):
                 placeholder="データの暗号化方法について\nアクセス制御の設定方法\n...",
             )
             if batch_text:
-                questions = [q.strip() for q in batch_text.split("\n") if q.strip()]
+                questions = _extract_lines(batch_text)
         else:
             batch_text = st.text_area(
                 "チェックしたいテキストを入力",
@@ -179,15 +422,7 @@ def batch_question_tab(vectordb: VectorDatabase):
             )
             if batch_text:
                 # 段落に分割（空行で区切る）
-                paragraphs = [
-                    p.strip() for p in batch_text.split("\n\n") if len(p.strip()) > 20
-                ]
-                if not paragraphs:
-                    # 改行で分割を試みる
-                    paragraphs = [
-                        p.strip() for p in batch_text.split("\n") if len(p.strip()) > 20
-                    ]
-                questions = paragraphs
+                questions = _extract_paragraphs(batch_text)
 
     else:
         uploaded_file = st.file_uploader(
@@ -200,157 +435,13 @@ def batch_question_tab(vectordb: VectorDatabase):
             source_name = uploaded_file.name
             file_extension = Path(uploaded_file.name).suffix.lower()
 
-            try:
-                if file_extension == ".csv":
-                    # CSV処理
-                    df = pd.read_csv(uploaded_file)
-                    st.write("📄 ファイルプレビュー:")
-                    st.dataframe(df.head())
-
-                    if processing_mode == "質問リスト処理":
-                        question_col = st.selectbox(
-                            "質問が含まれる列を選択", df.columns
-                        )
-                        if question_col:
-                            questions = df[question_col].dropna().astype(str).tolist()
-                    else:
-                        st.info(
-                            "資料チェックモード: 全列のテキストを抽出して段落としてチェックします"
-                        )
-                        all_text = df.to_string(index=False)
-                        questions = [
-                            line.strip()
-                            for line in all_text.split("\n")
-                            if len(line.strip()) > 20
-                        ]
-
-                elif file_extension in [".xlsx", ".xls"]:
-                    # Excel処理
-                    df = pd.read_excel(uploaded_file)
-                    st.write("📄 ファイルプレビュー:")
-                    st.dataframe(df.head())
-
-                    if processing_mode == "質問リスト処理":
-                        question_col = st.selectbox(
-                            "質問が含まれる列を選択", df.columns
-                        )
-                        if question_col:
-                            questions = df[question_col].dropna().astype(str).tolist()
-                    else:
-                        st.info(
-                            "資料チェックモード: 全列のテキストを抽出して段落としてチェックします"
-                        )
-                        all_text = df.to_string(index=False)
-                        questions = [
-                            line.strip()
-                            for line in all_text.split("\n")
-                            if len(line.strip()) > 20
-                        ]
-
-                elif file_extension == ".pdf":
-                    # PDF処理
-                    from pypdf import PdfReader
-                    import tempfile
-
-                    # 一時ファイルに保存
-                    with tempfile.NamedTemporaryFile(
-                        delete=False, suffix=".pdf"
-                    ) as tmp_file:
-                        tmp_file.write(uploaded_file.getvalue())
-                        tmp_path = tmp_file.name
-
-                    reader = PdfReader(tmp_path)
-                    full_text = ""
-                    for page in reader.pages:
-                        full_text += page.extract_text() + "\n"
-
-                    os.unlink(tmp_path)  # 一時ファイル削除
-
-                    st.write(f"📄 抽出されたテキスト（最初の500文字）:")
-                    st.text(full_text[:500] + "...")
-
-                    if processing_mode == "質問リスト処理":
-                        # 行単位で分割
-                        questions = [
-                            line.strip()
-                            for line in full_text.split("\n")
-                            if len(line.strip()) > 10
-                        ]
-                    else:
-                        # 段落単位で分割
-                        paragraphs = [
-                            p.strip()
-                            for p in full_text.split("\n\n")
-                            if len(p.strip()) > 20
-                        ]
-                        if not paragraphs:
-                            paragraphs = [
-                                p.strip()
-                                for p in full_text.split("\n")
-                                if len(p.strip()) > 20
-                            ]
-                        questions = paragraphs
-
-                elif file_extension == ".docx":
-                    # Word処理
-                    from docx import Document as DocxDocument
-                    import tempfile
-
-                    # 一時ファイルに保存
-                    with tempfile.NamedTemporaryFile(
-                        delete=False, suffix=".docx"
-                    ) as tmp_file:
-                        tmp_file.write(uploaded_file.getvalue())
-                        tmp_path = tmp_file.name
-
-                    doc = DocxDocument(tmp_path)
-                    paragraphs_text = [
-                        para.text.strip()
-                        for para in doc.paragraphs
-                        if para.text.strip()
-                    ]
-
-                    os.unlink(tmp_path)  # 一時ファイル削除
-
-                    st.write(f"📄 抽出された段落数: {len(paragraphs_text)}")
-                    if paragraphs_text:
-                        st.write("最初の段落:")
-                        st.text(paragraphs_text[0][:300] + "...")
-
-                    if processing_mode == "質問リスト処理":
-                        questions = paragraphs_text
-                    else:
-                        # 長い段落のみ（20文字以上）
-                        questions = [p for p in paragraphs_text if len(p) > 20]
-
-                elif file_extension == ".txt":
-                    # テキストファイル処理
-                    content = uploaded_file.getvalue().decode("utf-8", errors="ignore")
-
-                    st.write(f"📄 ファイル内容（最初の500文字）:")
-                    st.text(content[:500] + "...")
-
-                    if processing_mode == "質問リスト処理":
-                        questions = [
-                            line.strip() for line in content.split("\n") if line.strip()
-                        ]
-                    else:
-                        paragraphs = [
-                            p.strip()
-                            for p in content.split("\n\n")
-                            if len(p.strip()) > 20
-                        ]
-                        if not paragraphs:
-                            paragraphs = [
-                                p.strip()
-                                for p in content.split("\n")
-                                if len(p.strip()) > 20
-                            ]
-                        questions = paragraphs
-
-            except Exception as e:
-                st.error(f"ファイル処理エラー: {str(e)}")
-                questions = []
+            extractor = _EXTRACTORS.get(file_extension)
+            if extractor:
+                try:
+                    questions = extractor(uploaded_file, processing_mode)
+                except Exception as e:
+                    st.error(f"ファイル処理エラー: {str(e)}")
+                    questions = []
 
     if questions:
         if processing_mode == "質問リスト処理":
@@ -397,18 +488,18 @@ def history_tab():
     """履歴タブ"""
     st.header("検索履歴")
 
-    if not st.session_state.qa_history:
+    if not st.session_state.qa_history["タイムスタンプ"]:
         st.info("まだ検索履歴がありません")
         return
 
     # 履歴をDataFrameに変換
-    history_df = pd.DataFrame(st.session_state.qa_history)
+    history_df = _pd().DataFrame(st.session_state.qa_history)
 
     st.dataframe(history_df, use_container_width=True, hide_index=True)
 
     # CSV出力
     if st.button("📥 履歴をCSVでダウンロード"):
-        csv = history_df.to_csv(index=False, encoding="utf-8-sig")
+        csv = _df_to_csv_bytes(history_df)
         st.download_button(
             label="ダウンロード",
             data=csv,
@@ -417,16 +508,24 @@ def history_tab():
         )
 
     if st.button("🗑️ 履歴をクリア"):
-        st.session_state.qa_history = []
+        st.session_state.qa_history = _new_history()
         st.rerun()
 
 
 def search_and_display(
-    vectordb: VectorDatabase, query: str, top_k: int, score_threshold: float
+    vectordb: VectorDatabase,
+    query: str,
+    top_k: int,
+    score_threshold: float,
+    ef_search: int = None,
 ):
     """検索を実行して結果を表示"""
     with st.spinner("検索中..."):
-        results = vectordb.search(query, top_k=top_k, score_threshold=score_threshold)
+        # ef_searchはhnswlibバックエンドのみ対応（ChromaDBでは常にNone）
+        kwargs = {} if ef_search is None else {"ef_search": ef_search}
+        results = vectordb.search(
+            query, top_k=top_k, score_threshold=score_threshold, **kwargs
+        )
 
     if not results:
         st.warning("該当する回答が見つかりませんでした。質問を変えて試してください。")
@@ -444,7 +543,7 @@ def search_and_display(
             st.caption(f"出典: {result['source']}")
 
             # 履歴に追加
-            st.session_state.qa_history.append(
+            _append_history(
                 {
                     "タイムスタンプ": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     "検索クエリ": query,
@@ -456,6 +555,25 @@ def search_and_display(
             )
 
 
+def _df_to_csv_bytes(df) -> bytes:
+    """DataFrameをBOM付きUTF-8のCSVバイト列に変換（ダウンロード用）
+
+    文字列で返してStreamlit側で再エンコードさせるのではなく、
+    pandasのCライターでバイト列に直接書き出す（エンコード1回で済む）。
+    """
+    buf = io.BytesIO()
+    buf.write(b"\xef\xbb\xbf")  # Excelで文字化けしないためのBOM
+    df.to_csv(buf, index=False, encoding="utf-8")
+    return buf.getvalue()
+
+
+def _truncate_series(series, limit: int):
+    """文字列Seriesをlimit文字に切り詰め、切り詰めた場合は...を付与"""
+    return series.str.slice(0, limit) + series.str.len().gt(limit).map(
+        {True: "...", False: ""}
+    )
+
+
 def batch_search_and_display(
     vectordb: VectorDatabase,
     questions: list,
@@ -465,80 +583,119 @@ def batch_search_and_display(
     processing_mode: str = "質問リスト処理",
 ):
     """一括検索を実行"""
-    results_list = []
-
     progress_bar = st.progress(0)
     status_text = st.empty()
 
-    for i, question in enumerate(questions):
-        status_text.text(f"処理中: {i+1}/{len(questions)}")
-        progress_bar.progress((i + 1) / len(questions))
-
-        results = vectordb.search(
-            question, top_k=top_k, score_threshold=score_threshold
+    # 処理モードに応じて表示項目を変更
+    if processing_mode == "質問リスト処理":
+        columns = ("元の質問/テキスト", "マッチした質問", "回答", "類似度", "出典")
+        no_hit_answer = "該当する回答が見つかりませんでした"
+    else:  # 資料チェックモード
+        columns = (
+            "チェック対象段落",
+            "類似する既知の質問",
+            "セキュリティ観点",
+            "関連度",
+            "参照元",
+        )
+        no_hit_answer = (
+            "既知の質問に該当なし。新規の内容またはセキュリティ対象外の可能性があります。"
         )
 
-        if results:
-            best_result = results[0]
-
-            # 処理モードに応じて表示項目を変更
-            if processing_mode == "質問リスト処理":
-                result_item = {
-                    "元の質問/テキスト": question[:200]
-                    + ("..." if len(question) > 200 else ""),
-                    "マッチした質問": best_result["question"],
-                    "回答": best_result["answer"][:300]
-                    + ("..." if len(best_result["answer"]) > 300 else ""),
-                    "類似度": f"{best_result['score']:.2%}",
-                    "出典": best_result["source"],
-                }
-            else:  # 資料チェックモード
-                result_item = {
-                    "チェック対象段落": question[:200]
-                    + ("..." if len(question) > 200 else ""),
-                    "類似する既知の質問": best_result["question"],
-                    "セキュリティ観点": best_result["answer"][:300]
-                    + ("..." if len(best_result["answer"]) > 300 else ""),
-                    "関連度": f"{best_result['score']:.2%}",
-                    "参照元": best_result["source"],
-                }
-
-            results_list.append(result_item)
+    def _results_frame(pairs):
+        """(質問, 検索結果)のペア列から表示用DataFrameを構築
 
-            # 履歴に追加
-            st.session_state.qa_history.append(
-                {
-                    "タイムスタンプ": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                    "処理モード": processing_mode,
-                    "入力元": source_name,
-                    "検索クエリ": question[:100],
-                    "マッチした質問": best_result["question"],
-                    "回答": best_result["answer"],
-                    "類似度": f"{best_result['score']:.2%}",
-                    "出典": best_result["source"],
-                }
-            )
-        else:
-            if processing_mode == "質問リスト処理":
-                result_item = {
-                    "元の質問/テキスト": question[:200]
-                    + ("..." if len(question) > 200 else ""),
-                    "マッチした質問": "該当なし",
-                    "回答": "該当する回答が見つかりませんでした",
-                    "類似度": "0%",
-                    "出典": "-",
-                }
-            else:
-                result_item = {
-                    "チェック対象段落": question[:200]
-                    + ("..." if len(question) > 200 else ""),
-                    "類似する既知の質問": "該当なし",
-                    "セキュリティ観点": "既知の質問に該当なし。新規の内容またはセキュリティ対象外の可能性があります。",
-                    "関連度": "0%",
-                    "参照元": "-",
-                }
+        切り詰めは1件ごとのPythonスライスではなくpandasの一括文字列操作で行う。
+        """
+        frame = _pd().DataFrame(
+            {
+                columns[0]: [q for q, _ in pairs],
+                columns[1]: [
+                    r[0]["question"] if r else "該当なし" for _, r in pairs
+                ],
+                columns[2]: [r[0]["answer"] if r else no_hit_answer for _, r in pairs],
+                columns[3]: [f"{r[0]['score']:.2%}" if r else "0%" for _, r in pairs],
+                columns[4]: [r[0]["source"] if r else "-" for _, r in pairs],
+            }
+        )
+        frame[columns[0]] = _truncate_series(frame[columns[0]], 200)
+        frame[columns[2]] = _truncate_series(frame[columns[2]], 300)
+        return frame
+
+    # 結果テーブルは完了を待たず、処理済み分から順次このプレースホルダに流す
+    table_placeholder = st.empty()
+
+    # 質問をチャンクに分けてスレッドプールで並列検索
+    # （ChromaのHNSW検索はGIL解放されるためスレッドでも並列実行される。
+    #   1件ずつsubmitすると埋め込みのバッチ化が失われるのでチャンク単位で投げる。
+    #   キャッシュ済みの質問はbatch_search内部でスキップされる）
+    chunk_size = 32
+    results_per_question = [None] * len(questions)
+    done_count = 0
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = {
+            executor.submit(
+                vectordb.batch_search,
+                questions[start : start + chunk_size],
+                top_k,
+                score_threshold,
+            ): start
+            for start in range(0, len(questions), chunk_size)
+        }
+
+        # 進捗表示は最大100回程度に間引く
+        # （ウィジェット更新はWebSocket経由の再描画を伴い、件数分行うと検索より高くつく）
+        progress_step = max(1, len(questions) // 100)
+        progressed_count = 0
+
+        flushed_count = 0
+        for future in as_completed(futures):
+            start = futures[future]
+            for offset, chunk_result in enumerate(future.result()):
+                results_per_question[start + offset] = chunk_result
+                done_count += 1
+
+            if (
+                done_count - progressed_count >= progress_step
+                or done_count == len(questions)
+            ):
+                progressed_count = done_count
+                status_text.text(f"検索中: {done_count}/{len(questions)}")
+                progress_bar.progress(done_count / len(questions))
+
+            # 25件ごとに処理済み分を順次表示（最初の結果までの待ち時間を短縮）
+            if done_count - flushed_count >= 25:
+                flushed_count = done_count
+                done_pairs = [
+                    (q, r)
+                    for q, r in zip(questions, results_per_question)
+                    if r is not None
+                ]
+                table_placeholder.dataframe(
+                    _results_frame(done_pairs),
+                    use_container_width=True,
+                    hide_index=True,
+                )
 
-            results_list.append(result_item)
+    # 履歴はローカルに集めてからまとめて追加
+    # （session_state内のバッファを1行ずつ触らず、列ごとに1回のextendで済ませる）
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    history_rows = [
+        {
+            "タイムスタンプ": timestamp,
+            "処理モード": processing_mode,
+            "入力元": source_name,
+            "検索クエリ": question[:100],
+            "マッチした質問": results[0]["question"],
+            "回答": results[0]["answer"],
+            "類似度": f"{results[0]['score']:.2%}",
+            "出典": results[0]["source"],
+        }
+        for question, results in zip(questions, results_per_question)
+        if results
+    ]
+    _extend_history(history_rows)
 
     status_text.empty()
     progress_bar.empty()
@@ -551,12 +708,12 @@ def batch_search_and_display(
             "💡 ヒント: 関連度が高い項目は、既知のセキュリティ質問に類似しています。関連度が低い項目は新規の内容か、セキュリティ対象外の可能性があります。"
         )
 
-    # 結果をDataFrameで表示
-    results_df = pd.DataFrame(results_list)
-    st.dataframe(results_df, use_container_width=True, hide_index=True)
+    # 全件の結果でプレースホルダを最終更新
+    results_df = _results_frame(list(zip(questions, results_per_question)))
+    table_placeholder.dataframe(results_df, use_container_width=True, hide_index=True)
 
     # CSV出力
-    csv = results_df.to_csv(index=False, encoding="utf-8-sig")
+    csv = _df_to_csv_bytes(results_df)
 
     download_filename = (
         f"security_check_results_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
@@ -574,25 +731,52 @@ def batch_search_and_display(
     )
 
 
+def _write_temp_file(file_name: str, file_bytes: bytes) -> Path:
+    """アップロードファイルをdata/rawに保存してパスを返す"""
+    temp_path = Path(RAW_DATA_DIR) / file_name
+    temp_path.parent.mkdir(parents=True, exist_ok=True)
+
+    with open(temp_path, "wb") as f:
+        f.write(file_bytes)
+
+    return temp_path
+
+
 def process_uploaded_files(uploaded_files, vectordb: VectorDatabase):
     """アップロードされたファイルを処理"""
     processor = DocumentProcessor()
     all_qa_pairs = []
 
     with st.spinner("ファイルを処理中..."):
-        for uploaded_file in uploaded_files:
-            # 一時ファイルとして保存
-            temp_path = Path(RAW_DATA_DIR) / uploaded_file.name
-            temp_path.parent.mkdir(parents=True, exist_ok=True)
-
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-
-            # 処理
-            qa_pairs = processor.process_file(str(temp_path))
-            all_qa_pairs.extend(qa_pairs)
-
-            st.info(f"✓ {uploaded_file.name}: {len(qa_pairs)}件のQ&Aペアを抽出")
+        # 保存（I/Oバウンド→スレッドプール）とパース（CPUバウンド→
+        # プロセスプール）を分離し、ファイルNの書き込み中にファイルN-1の
+        # パースが進むようパイプライン化する
+        with ThreadPoolExecutor(
+            max_workers=min(4, len(uploaded_files))
+        ) as io_pool, ProcessPoolExecutor(
+            max_workers=min(os.cpu_count() or 1, len(uploaded_files))
+        ) as cpu_pool:
+            write_futures = {
+                io_pool.submit(
+                    _write_temp_file, f.name, bytes(f.getbuffer())
+                ): f.name
+                for f in uploaded_files
+            }
+
+            # 書き込みが終わったファイルから順にパースを投入
+            parse_futures = {}
+            for write_future in as_completed(write_futures):
+                temp_path = write_future.result()
+                parse_futures[
+                    cpu_pool.submit(processor.process_file, str(temp_path))
+                ] = write_futures[write_future]
+
+            for parse_future in as_completed(parse_futures):
+                file_name = parse_futures[parse_future]
+                qa_pairs = parse_future.result()
+                all_qa_pairs.extend(qa_pairs)
+
+                st.info(f"✓ {file_name}: {len(qa_pairs)}件のQ&Aペアを抽出")
 
     if all_qa_pairs:
         with st.spinner("データベースに追加中..."):
@@ -5,6 +5,7 @@ PDF、Word、Excel、テキストファイルからQ&Aペアを抽出
 
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from typing import List, Dict, Optional
 from pathlib import Path
 import logging
@@ -16,6 +17,21 @@ from docx import Document
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Q&A抽出用のプリコンパイル済みパターン（対応形式は_extract_qa_pairsを参照）
+# 4パターンを1つの選択肢（alternation）に結合し、テキストの走査を4回から
+# 1回に減らす。google-re2（線形時間DFA）への置き換えも検討したが、
+# 先読み(?=...)が未対応のため標準reを使用している
+# 回答の終端はどの形式の次の質問マーカーでも良い（形式が混在したテキストで
+# 片方の形式の回答がもう片方の質問を飲み込まないようにする）
+_QA_NEXT = r"(?=[Qq][.:]|質問[.::\s]|【質問】|Q[0-9]+[.:]|$)"
+_QA_COMBINED = re.compile(
+    r"[Qq][.:]\s*(?P<q1>.+?)\s*[Aa][.:]\s*(?P<a1>.+?)" + _QA_NEXT
+    + r"|質問[.::\s](?P<q2>.+?)\s*回答[.::\s](?P<a2>.+?)" + _QA_NEXT
+    + r"|【質問】\s*(?P<q3>.+?)\s*【回答】\s*(?P<a3>.+?)" + _QA_NEXT
+    + r"|Q[0-9]+[.:]\s*(?P<q4>.+?)\s*A[0-9]+[.:]\s*(?P<a4>.+?)" + _QA_NEXT,
+    re.DOTALL | re.IGNORECASE,
+)
+
 
 class DocumentProcessor:
     """各種ドキュメントフォーマットからQ&Aペアを抽出"""
@@ -59,18 +75,14 @@ class DocumentProcessor:
 
     def _process_pdf(self, file_path: Path) -> List[Dict[str, str]]:
         """PDFファイルからテキストを抽出してQ&Aペアに変換"""
-        qa_pairs = []
-
         reader = PdfReader(str(file_path))
-        full_text = ""
 
-        for page in reader.pages:
-            full_text += page.extract_text() + "\n"
+        # ページごとの+=連結はO(n^2)になるため、joinで一括結合する
+        # （extract_text()がNoneを返すページは空文字として扱う）
+        full_text = "\n".join(page.extract_text() or "" for page in reader.pages)
 
         # Q&Aペアの抽出を試みる
-        qa_pairs = self._extract_qa_pairs(full_text, file_path.name)
-
-        return qa_pairs
+        return self._extract_qa_pairs(full_text, file_path.name)
 
     def _process_docx(self, file_path: Path) -> List[Dict[str, str]]:
         """Wordファイルからテキストを抽出してQ&Aペアに変換"""
@@ -87,6 +99,31 @@ class DocumentProcessor:
 
         return qa_pairs
 
+    def _qa_pairs_from_frame(
+        self, df: pd.DataFrame, question_col, answer_col, source: str
+    ) -> List[Dict[str, str]]:
+        """DataFrameのQ&A列からQ&Aペアを抽出
+
+        iterrows()による行単位のループではなく、pandasのC実装の
+        文字列操作で一括にstrip・フィルタする。
+        """
+        questions = df[question_col].astype(str).str.strip()
+        answers = df[answer_col].astype(str).str.strip()
+
+        mask = (
+            (questions != "")
+            & (answers != "")
+            & (questions != "nan")
+            & (answers != "nan")
+        )
+
+        return [
+            {"question": question, "answer": answer, "source": source}
+            for question, answer in zip(
+                questions[mask].tolist(), answers[mask].tolist()
+            )
+        ]
+
     def _process_excel(self, file_path: Path) -> List[Dict[str, str]]:
         """Excelファイルからデータを読み込んでQ&Aペアに変換"""
         qa_pairs = []
@@ -114,22 +151,26 @@ class DocumentProcessor:
                 ):
                     answer_col = col
 
+            # 列名で見つからなくても、文字列列がちょうど2つなら
+            # (質問, 回答)とみなす（「項目/内容」のようなヘッダへの対応）
+            if question_col is None or answer_col is None:
+                text_cols = df.select_dtypes(include=["object"]).columns
+                if len(text_cols) == 2:
+                    question_col, answer_col = text_cols
+
             # Q&A形式のデータがある場合
             if question_col is not None and answer_col is not None:
-                for _, row in df.iterrows():
-                    question = str(row[question_col]).strip()
-                    answer = str(row[answer_col]).strip()
-
-                    if question and answer and question != "nan" and answer != "nan":
-                        qa_pairs.append(
-                            {
-                                "question": question,
-                                "answer": answer,
-                                "source": f"{file_path.name} - {sheet_name}",
-                            }
-                        )
+                qa_pairs.extend(
+                    self._qa_pairs_from_frame(
+                        df,
+                        question_col,
+                        answer_col,
+                        f"{file_path.name} - {sheet_name}",
+                    )
+                )
             else:
                 # Q&A形式でない場合、全テキストを結合して処理
+                # （to_string()+正規表現は巨大シートでは非常に遅いため最終手段）
                 text = df.to_string()
                 qa_pairs.extend(
                     self._extract_qa_pairs(text, f"{file_path.name} - {sheet_name}")
@@ -168,19 +209,16 @@ class DocumentProcessor:
             ):
                 answer_col = col
 
+        # 列名で見つからなくても、文字列列がちょうど2つなら(質問, 回答)とみなす
+        if question_col is None or answer_col is None:
+            text_cols = df.select_dtypes(include=["object"]).columns
+            if len(text_cols) == 2:
+                question_col, answer_col = text_cols
+
         if question_col is not None and answer_col is not None:
-            for _, row in df.iterrows():
-                question = str(row[question_col]).strip()
-                answer = str(row[answer_col]).strip()
-
-                if question and answer and question != "nan" and answer != "nan":
-                    qa_pairs.append(
-                        {
-                            "question": question,
-                            "answer": answer,
-                            "source": file_path.name,
-                        }
-                    )
+            qa_pairs.extend(
+                self._qa_pairs_from_frame(df, question_col, answer_col, file_path.name)
+            )
         else:
             text = df.to_string()
             qa_pairs.extend(self._extract_qa_pairs(text, file_path.name))
@@ -199,37 +237,36 @@ class DocumentProcessor:
         """
         qa_pairs = []
 
-        # 複数のパターンでQ&Aペアを抽出
-        patterns = [
-            r"[Qq][.:]\s*(.+?)\s*[Aa][.:]\s*(.+?)(?=[Qq][.:]|$)",
-            r"質問[.::\s](.+?)\s*回答[.::\s](.+?)(?=質問|$)",
-            r"【質問】\s*(.+?)\s*【回答】\s*(.+?)(?=【質問】|$)",
-            r"Q[0-9]+[.:]\s*(.+?)\s*A[0-9]+[.:]\s*(.+?)(?=Q[0-9]+|$)",
-        ]
-
-        for pattern in patterns:
-            matches = re.findall(pattern, text, re.DOTALL | re.IGNORECASE)
-            for match in matches:
-                if len(match) == 2:
-                    question = match[0].strip()
-                    answer = match[1].strip()
-
-                    if len(question) > 5 and len(answer) > 5:  # 最小長チェック
-                        qa_pairs.append(
-                            {"question": question, "answer": answer, "source": source}
-                        )
+        # 結合パターンで1回の走査で全形式のQ&Aペアを抽出
+        # （finditerで逐次処理し、巨大なテキストでも全マッチをリスト化しない）
+        for match in _QA_COMBINED.finditer(text):
+            # マッチした選択肢の名前付きグループを特定
+            question, answer = next(
+                (match.group(f"q{i}"), match.group(f"a{i}"))
+                for i in range(1, 5)
+                if match.group(f"q{i}") is not None
+            )
+            question = question.strip()
+            answer = answer.strip()
+
+            if len(question) > 5 and len(answer) > 5:  # 最小長チェック
+                qa_pairs.append(
+                    {"question": question, "answer": answer, "source": source}
+                )
 
         # パターンマッチで見つからない場合、段落単位でチャンクとして保存
+        # （stripは段落ごとに1回だけ実行し、まとめてextendする）
         if not qa_pairs:
-            paragraphs = [p.strip() for p in text.split("\n\n") if len(p.strip()) > 50]
-            for i, paragraph in enumerate(paragraphs):
-                qa_pairs.append(
-                    {
-                        "question": f"{source} - セクション {i+1}",
-                        "answer": paragraph,
-                        "source": source,
-                    }
-                )
+            stripped = (p.strip() for p in text.split("\n\n"))
+            paragraphs = [p for p in stripped if len(p) > 50]
+            qa_pairs.extend(
+                {
+                    "question": f"{source} - セクション {i+1}",
+                    "answer": paragraph,
+                    "source": source,
+                }
+                for i, paragraph in enumerate(paragraphs)
+            )
 
         return qa_pairs
 
@@ -253,14 +290,27 @@ def process_directory(directory_path: str) -> List[Dict[str, str]]:
         logger.error(f"ディレクトリが存在しません: {directory_path}")
         return []
 
-    for file_path in directory.rglob("*"):
-        if (
-            file_path.is_file()
-            and file_path.suffix.lower() in processor.supported_extensions
-        ):
-            qa_pairs = processor.process_file(str(file_path))
-            all_qa_pairs.extend(qa_pairs)
-            logger.info(f"{file_path.name} から {len(qa_pairs)} 件のQ&Aペアを抽出")
+    eligible_files = [
+        file_path
+        for file_path in directory.rglob("*")
+        if file_path.is_file()
+        and file_path.suffix.lower() in processor.supported_extensions
+    ]
+
+    if eligible_files:
+        # ファイル単位で並列処理（PDF/Word/Excelのパースはいずれも
+        # CPUバウンドでファイル間に依存がないため、プロセスプールが効く）
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for file_path, qa_pairs in zip(
+                eligible_files,
+                executor.map(
+                    processor.process_file, [str(p) for p in eligible_files]
+                ),
+            ):
+                all_qa_pairs.extend(qa_pairs)
+                logger.info(
+                    f"{file_path.name} から {len(qa_pairs)} 件のQ&Aペアを抽出"
+                )
 
     logger.info(f"合計 {len(all_qa_pairs)} 件のQ&Aペアを抽出しました")
 
@@ -0,0 +1,97 @@
+"""
+埋め込みキャッシュモジュール
+テキスト内容のハッシュをキーに埋め込みベクトルをSQLiteへ永続化
+"""
+
+import hashlib
+import sqlite3
+import threading
+import logging
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """内容アドレス型の永続埋め込みキャッシュ
+
+    (モデル名, SHA-256(テキスト)) をキーにfloat32ベクトルをSQLiteへ保存する。
+    data/rawからの再構築や同一クエリの再検索で、支配的コストである
+    transformerのフォワードパスを丸ごとスキップできる。モデル名がキーに
+    含まれるため、EMBEDDING_MODELを切り替えると自動的に別エントリになる。
+    """
+
+    def __init__(self, db_path: str, model_name: str):
+        """
+        初期化
+
+        Args:
+            db_path: SQLiteファイルのパス
+            model_name: キーに含める埋め込みモデル名
+        """
+        self.model_name = model_name
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key BLOB PRIMARY KEY, vec BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str) -> bytes:
+        """(モデル名, テキスト)からキャッシュキーを生成"""
+        digest = hashlib.sha256()
+        digest.update(self.model_name.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+        return digest.digest()
+
+    def get_or_compute_many(
+        self, texts: List[str], compute_batch: Callable[[List[str]], np.ndarray]
+    ) -> np.ndarray:
+        """キャッシュを参照し、未登録のテキストのみまとめて計算して返す
+
+        Args:
+            texts: 埋め込み対象のテキストのリスト
+            compute_batch: 未登録テキストのリストを受け取り2次元配列を返す関数
+
+        Returns:
+            textsと同じ順序のfloat32埋め込み行列
+        """
+        keys = [self._key(t) for t in texts]
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._conn.execute(
+                    "SELECT vec FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    vectors[i] = np.frombuffer(row[0], dtype=np.float32)
+
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            computed = np.asarray(
+                compute_batch([texts[i] for i in missing]), dtype=np.float32
+            )
+
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vec) VALUES (?, ?)",
+                    [
+                        (keys[i], computed[j].tobytes())
+                        for j, i in enumerate(missing)
+                    ],
+                )
+                self._conn.commit()
+
+            for j, i in enumerate(missing):
+                vectors[i] = computed[j]
+
+        logger.info(
+            f"埋め込みキャッシュ: {len(texts) - len(missing)}/{len(texts)}件ヒット"
+        )
+        return np.vstack(vectors)
@@ -0,0 +1,365 @@
+"""
+hnswlibベースのベクトルデータベースモジュール
+小規模コーパス向けにChromaDBをインプロセスのHNSWインデックスで置き換える
+"""
+
+import json
+import threading
+from typing import List, Dict, Optional
+from pathlib import Path
+import logging
+
+import numpy as np
+import hnswlib
+
+try:
+    from src.query_cache import QueryCache
+    from src.embedding_cache import EmbeddingCache
+    from src.vector_database import _load_embedding_model
+except ImportError:  # src/ 内から直接実行された場合
+    from query_cache import QueryCache
+    from embedding_cache import EmbeddingCache
+    from vector_database import _load_embedding_model
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HnswVectorDatabase:
+    """hnswlib + JSONメタデータによるインプロセスのベクトルデータベース
+
+    VectorDatabaseと同じ公開APIを提供するドロップイン代替。
+    ChromaDBのSQLite・クライアント層を介さず、hnswlib.Indexを直接
+    呼び出すため、本アプリの規模（数万件程度のQ&Aペア）では追加・検索
+    ともにオーバーヘッドが大幅に小さい。メタデータは追加順のリストとして
+    JSONファイルに永続化し、検索結果のラベルで引く。
+
+    利用するにはhnswlibの導入と環境変数 VECTOR_BACKEND=hnswlib の指定が必要
+    （既定はChromaDBバックエンドのまま）。
+    """
+
+    # 挿入時にL2正規化するため内積空間でのスコアはcosine類似度と一致する
+    # （VectorDatabaseのHNSWパラメータと同じ方針）
+    HNSW_SPACE = "ip"
+    HNSW_CONSTRUCTION_EF = 200
+    HNSW_M = 32
+
+    def __init__(
+        self,
+        persist_directory: str = "./vectordb",
+        embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+        collection_name: str = "security_qa",
+    ):
+        """
+        初期化
+
+        Args:
+            persist_directory: インデックスとメタデータの保存先ディレクトリ
+            embedding_model: 使用する埋め込みモデル（CPU対応の軽量モデル）
+            collection_name: インデックスファイル名のプレフィックス
+        """
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+
+        Path(persist_directory).mkdir(parents=True, exist_ok=True)
+
+        self._index_path = Path(persist_directory) / f"{collection_name}.hnsw"
+        self._metadata_path = Path(persist_directory) / f"{collection_name}_meta.json"
+
+        # 埋め込みモデルの読み込み（プロセス内で共有されるシングルトン）
+        self.embedding_model = _load_embedding_model(embedding_model)
+
+        # hnswlibのaddは並行呼び出しに対して安全でないため書き込みをロックで保護
+        # （knn_queryの並行読み出しは安全）
+        self._write_lock = threading.RLock()
+
+        self._index: Optional[hnswlib.Index] = None
+        self._metadatas: List[Dict[str, str]] = []
+
+        # _ef_searchはライブインデックスにset_ef済みの値のみを保持する。
+        # インデックス未作成の間に要求された値は_ef_requestedに保留し、
+        # _ensure_indexでの作成時に適用する
+        self._ef_search = None
+        self._ef_requested = None
+
+        if self._index_path.exists() and self._metadata_path.exists():
+            with open(self._metadata_path, "r", encoding="utf-8") as f:
+                self._metadatas = json.load(f)
+
+            self._index = hnswlib.Index(
+                space=self.HNSW_SPACE, dim=self._stored_dim()
+            )
+            self._index.load_index(
+                str(self._index_path), max_elements=len(self._metadatas)
+            )
+            logger.info(
+                f"既存のインデックス '{collection_name}' を読み込みました"
+                f"（{len(self._metadatas)}件）"
+            )
+
+        # 検索結果・クエリ埋め込みのLRU + TTLキャッシュ
+        self._result_cache = QueryCache(max_size=2000, ttl_seconds=600)
+        self._embedding_cache = QueryCache(max_size=2000, ttl_seconds=600)
+
+        # 内容アドレス型の永続埋め込みキャッシュ（Chromaバックエンドと共有）
+        self._persistent_cache = EmbeddingCache(
+            str(Path(persist_directory) / "embedding_cache.sqlite3"),
+            embedding_model,
+        )
+
+    def _stored_dim(self) -> int:
+        """保存済みインデックスの次元数をメタデータファイルの隣から読む"""
+        dim_path = self._metadata_path.with_suffix(".dim")
+        with open(dim_path, "r", encoding="utf-8") as f:
+            return int(f.read())
+
+    def _ensure_index(self, dim: int, capacity: int):
+        """インデックスを未作成なら作成し、容量が足りなければ拡張する"""
+        if self._index is None:
+            self._index = hnswlib.Index(space=self.HNSW_SPACE, dim=dim)
+            self._index.init_index(
+                max_elements=max(capacity, 1024),
+                ef_construction=self.HNSW_CONSTRUCTION_EF,
+                M=self.HNSW_M,
+            )
+
+            # インデックス未作成の間に要求されていたef_searchをここで適用
+            if self._ef_requested is not None:
+                self._index.set_ef(self._ef_requested)
+                self._ef_search = self._ef_requested
+                self._ef_requested = None
+        elif self._index.get_max_elements() < capacity:
+            self._index.resize_index(max(capacity, self._index.get_max_elements() * 2))
+
+    def _encode_queries(self, queries: List[str]):
+        """クエリの埋め込みベクトルを生成（キャッシュ済みのものは再利用）"""
+        embeddings = [self._embedding_cache.get(q) for q in queries]
+
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            encoded = self._persistent_cache.get_or_compute_many(
+                [queries[i] for i in missing],
+                lambda texts: self.embedding_model.encode(
+                    texts,
+                    batch_size=64,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                ),
+            )
+            for idx, vector in zip(missing, encoded):
+                embeddings[idx] = vector
+                self._embedding_cache.put(queries[idx], vector)
+
+        return embeddings
+
+    def _persist(self):
+        """インデックスとメタデータをディスクへ保存"""
+        self._index.save_index(str(self._index_path))
+
+        with open(self._metadata_path, "w", encoding="utf-8") as f:
+            json.dump(self._metadatas, f, ensure_ascii=False)
+
+        with open(self._metadata_path.with_suffix(".dim"), "w", encoding="utf-8") as f:
+            f.write(str(self._index.dim))
+
+    def add_qa_pairs(
+        self, qa_pairs: List[Dict[str, str]], batch_size: int = 100
+    ) -> int:
+        """
+        Q&Aペアをベクトルデータベースに追加
+
+        Args:
+            qa_pairs: [{"question": "...", "answer": "...", "source": "..."}, ...]
+            batch_size: 互換性のための引数（hnswlibは一括追加のため未使用）
+
+        Returns:
+            追加された件数
+        """
+        if not qa_pairs:
+            logger.warning("追加するQ&Aペアがありません")
+            return 0
+
+        logger.info(f"{len(qa_pairs)}件のQ&Aペアを追加中...")
+
+        documents = []
+        metadatas = []
+
+        for qa in qa_pairs:
+            documents.append(f"質問: {qa['question']}\n回答: {qa['answer']}")
+            metadatas.append(
+                {
+                    "question": qa["question"],
+                    "answer": qa["answer"],
+                    "source": qa.get("source", "unknown"),
+                }
+            )
+
+        # 重複ドキュメントは1回だけエンコードし、永続キャッシュも経由する
+        # （VectorDatabase.add_qa_pairsと同じ方針）
+        unique_docs, inverse = np.unique(documents, return_inverse=True)
+        unique_embeddings = self._persistent_cache.get_or_compute_many(
+            unique_docs.tolist(),
+            lambda texts: self.embedding_model.encode(
+                texts,
+                batch_size=256,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ),
+        )
+        embeddings = unique_embeddings[inverse].astype(np.float32)
+
+        with self._write_lock:
+            start = len(self._metadatas)
+            self._ensure_index(
+                embeddings.shape[1], start + len(qa_pairs)
+            )
+            self._index.add_items(
+                embeddings, np.arange(start, start + len(qa_pairs))
+            )
+            self._metadatas.extend(metadatas)
+            self._persist()
+
+        self._result_cache.clear()
+        self._embedding_cache.clear()
+
+        logger.info(f"{len(qa_pairs)}件のQ&Aペアを追加しました")
+        return len(qa_pairs)
+
+    def _knn(self, query_embeddings, top_k: int, score_threshold: float):
+        """複数クエリベクトルのk近傍を検索し、search()の形式に整形して返す"""
+        k = min(top_k, len(self._metadatas))
+        labels, distances = self._index.knn_query(
+            np.asarray(query_embeddings, dtype=np.float32), k=k
+        )
+
+        all_results = []
+        for row_labels, row_distances in zip(labels, distances):
+            search_results = []
+            for label, distance in zip(row_labels, row_distances):
+                # ip空間の距離は 1 - 内積（= 正規化済みなら 1 - cosine類似度）
+                score = 1 - float(distance)
+                if score >= score_threshold:
+                    metadata = self._metadatas[int(label)]
+                    search_results.append(
+                        {
+                            "question": metadata["question"],
+                            "answer": metadata["answer"],
+                            "source": metadata["source"],
+                            "score": score,
+                        }
+                    )
+            all_results.append(search_results)
+
+        return all_results
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        score_threshold: float = 0.0,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict]:
+        """
+        類似検索を実行（VectorDatabase.searchと同じ形式で返す）
+
+        Args:
+            query: 検索クエリ
+            top_k: 返す結果の最大数
+            score_threshold: スコアの閾値（これ以上のスコアのみ返す）
+            ef_search: HNSW探索時の候補リスト幅（Noneならデフォルト）
+        """
+        if ef_search is not None and ef_search != self._ef_search:
+            if self._index is not None:
+                self._index.set_ef(ef_search)
+                self._ef_search = ef_search
+            else:
+                # インデックスがまだ無ければ保留し、作成時に適用する
+                # （ここで_ef_searchに記録すると、作成後の同値の検索が
+                #   変更なしと判定されset_efが一度も呼ばれなくなる）
+                self._ef_requested = ef_search
+
+        cache_key = (query, top_k, score_threshold, ef_search)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        if not self._metadatas:
+            logger.warning("データベースが空です")
+            return []
+
+        query_embedding = self._encode_queries([query])[0]
+        search_results = self._knn([query_embedding], top_k, score_threshold)[0]
+
+        self._result_cache.put(cache_key, search_results)
+
+        logger.info(f"検索結果: {len(search_results)}件")
+        return search_results
+
+    def batch_search(
+        self, queries: List[str], top_k: int = 5, score_threshold: float = 0.0
+    ) -> List[List[Dict]]:
+        """複数クエリの類似検索を一括実行（VectorDatabase.batch_searchと同形式）"""
+        if not queries:
+            return []
+
+        if not self._metadatas:
+            logger.warning("データベースが空です")
+            return [[] for _ in queries]
+
+        all_results: List[Optional[List[Dict]]] = [None] * len(queries)
+        pending = []
+        for i, query in enumerate(queries):
+            cached = self._result_cache.get((query, top_k, score_threshold))
+            if cached is not None:
+                all_results[i] = cached
+            else:
+                pending.append(i)
+
+        if pending:
+            query_embeddings = self._encode_queries([queries[i] for i in pending])
+            pending_results = self._knn(query_embeddings, top_k, score_threshold)
+
+            for orig_i, search_results in zip(pending, pending_results):
+                all_results[orig_i] = search_results
+                self._result_cache.put(
+                    (queries[orig_i], top_k, score_threshold), search_results
+                )
+
+        logger.info(
+            f"一括検索完了: {len(queries)}件のクエリ（キャッシュヒット: {len(queries) - len(pending)}件）"
+        )
+        return all_results
+
+    # 別名（複数クエリの一括検索APIとしてどちらの名前でも呼び出せるように）
+    search_batch = batch_search
+
+    def clear_database(self):
+        """データベースをクリア"""
+        with self._write_lock:
+            self._index = None
+            self._metadatas = []
+            self._ef_search = None
+            self._ef_requested = None
+
+            for path in (
+                self._index_path,
+                self._metadata_path,
+                self._metadata_path.with_suffix(".dim"),
+            ):
+                if path.exists():
+                    path.unlink()
+
+            self._result_cache.clear()
+            self._embedding_cache.clear()
+
+        logger.info(f"インデックス '{self.collection_name}' を削除しました")
+
+    def get_stats(self) -> Dict:
+        """データベースの統計情報を取得"""
+        return {
+            "total_qa_pairs": len(self._metadatas),
+            "collection_name": self.collection_name,
+            "persist_directory": self.persist_directory,
+        }
@@ -0,0 +1,105 @@
+"""
+ONNX埋め込みモデルモジュール
+int8量子化したMiniLMをONNX Runtimeで実行し、CPU推論を高速化
+"""
+
+import os
+import logging
+from typing import List, Union
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class OnnxMiniLM:
+    """ONNX Runtime上で動作するMiniLM埋め込みモデル
+
+    SentenceTransformer.encode() と互換のインターフェースを提供し、
+    VectorDatabaseからそのまま差し替えて使える。動的int8量子化により
+    CPUではFP32のPyTorch実行より2〜4倍高速になる。
+
+    モデルは事前に一度だけ変換しておく:
+
+        optimum-cli export onnx \\
+            --model sentence-transformers/all-MiniLM-L6-v2 \\
+            --task feature-extraction --optimize O2 onnx/
+        python -c "from onnxruntime.quantization import quantize_dynamic; \\
+            quantize_dynamic('onnx/model.onnx', 'onnx/model_quantized.onnx')"
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+    ):
+        """
+        初期化
+
+        Args:
+            model_path: 量子化済みONNXモデルのパス（例: onnx/model_quantized.onnx）
+            tokenizer_name: トークナイザーの取得元モデル名
+        """
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+
+        logger.info(f"ONNXモデルを読み込み中: {model_path}")
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 64,
+        normalize_embeddings: bool = False,
+        convert_to_numpy: bool = True,
+        show_progress_bar: bool = False,
+    ) -> np.ndarray:
+        """テキストを埋め込みベクトルに変換（SentenceTransformer.encode互換）
+
+        Args:
+            sentences: 単一テキストまたはテキストのリスト
+            batch_size: 1回のフォワードパスで処理する件数
+            normalize_embeddings: Trueの場合、L2正規化したベクトルを返す
+            convert_to_numpy: 互換性のための引数（常にnumpy配列を返す）
+            show_progress_bar: 互換性のための引数（未使用）
+
+        Returns:
+            埋め込みベクトル（単一テキストなら1次元、リストなら2次元配列）
+        """
+        is_single = isinstance(sentences, str)
+        texts = [sentences] if is_single else list(sentences)
+
+        batches = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=256,
+                return_tensors="np",
+            )
+            inputs = {k: v for k, v in tokens.items() if k in self._input_names}
+            hidden_states = self.session.run(None, inputs)[0]
+
+            # attention maskを使った平均プーリング
+            mask = tokens["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden_states * mask).sum(axis=1) / np.clip(
+                mask.sum(axis=1), 1e-9, None
+            )
+            batches.append(pooled)
+
+        embeddings = np.vstack(batches).astype(np.float32)
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings[0] if is_single else embeddings
@@ -0,0 +1,61 @@
+"""
+クエリキャッシュモジュール
+検索結果とクエリ埋め込みをLRU + TTLでキャッシュし、同一クエリの再計算を回避
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class QueryCache:
+    """スレッドセーフなLRU + TTLキャッシュ
+
+    Streamlitはウィジェット操作のたびにスクリプト全体を再実行するため、
+    同一クエリの検索・埋め込み生成が頻繁に繰り返される。ヒット時は
+    埋め込みモデルのフォワードパスとANN検索を丸ごとスキップできる。
+    """
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 600):
+        """
+        初期化
+
+        Args:
+            max_size: キャッシュの最大エントリ数（超過時は最も古いものから破棄）
+            ttl_seconds: エントリの有効期限（秒）
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key) -> Optional[Any]:
+        """キーに対応する値を取得（期限切れ・未登録ならNone）"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                return None
+
+            # LRU: アクセスされたエントリを末尾（最新）に移動
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        """値を登録（容量超過時は最も古いエントリを破棄）"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """全エントリを破棄"""
+        with self._lock:
+            self._data.clear()
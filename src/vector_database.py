@@ -3,22 +3,105 @@
 ChromaDBを使用してQ&AペアをベクトルDB化し、類似検索を実行
 """
 
+import functools
 import os
+import uuid
 from typing import List, Dict, Optional
 from pathlib import Path
 import logging
 
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from sentence_transformers import SentenceTransformer
 
+try:
+    from src.query_cache import QueryCache
+    from src.embedding_cache import EmbeddingCache
+except ImportError:  # src/ 内から直接実行された場合
+    from query_cache import QueryCache
+    from embedding_cache import EmbeddingCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _pin_torch_threads():
+    """PyTorchのスレッド数をCPUコア数に合わせて固定する
+
+    デフォルトではMKL/OpenBLASがStreamlitやpandasのスレッドと
+    CPUを奪い合ってスラッシングを起こすことがあるため、encodeの
+    matmul用スレッドをコア数-1に抑え、インターオペ並列は1にする
+    （encodeは単一ストリームのため不要）。TORCH_NUM_THREADSで上書き可能。
+    """
+    import torch
+
+    num_threads = int(
+        os.getenv("TORCH_NUM_THREADS", max(1, (os.cpu_count() or 2) - 1))
+    )
+    torch.set_num_threads(num_threads)
+
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # 並列処理の開始後は変更できない（その場合は既定値のまま）
+        pass
+
+    logger.info(f"PyTorchスレッド数を{num_threads}に設定しました")
+
+
+@functools.lru_cache(maxsize=1)
+def _load_embedding_model(embedding_model: str):
+    """埋め込みモデルを読み込む（プロセス内シングルトン）
+
+    VectorDatabaseを複数生成しても（Streamlitの別セッションや
+    build_database_from_directoryの呼び出しごと）、同じモデル名なら
+    読み込み済みのインスタンスを共有する。
+    """
+    _pin_torch_threads()
+
+    logger.info(f"埋め込みモデルを読み込み中: {embedding_model}")
+
+    # .onnxを指定した場合はint8量子化モデルをONNX Runtimeで実行（CPUで2〜4倍高速）
+    if embedding_model.endswith(".onnx"):
+        try:
+            from src.onnx_embedder import OnnxMiniLM
+        except ImportError:
+            from onnx_embedder import OnnxMiniLM
+
+        return OnnxMiniLM(embedding_model)
+
+    # sentence-transformers>=3.2はONNXバックエンドをサポートしており、
+    # CPUではLayerNorm/GELU/attentionの演算子融合で2〜4倍高速になる。
+    # optimum/onnxruntime未導入の環境ではPyTorchにフォールバック
+    try:
+        model = SentenceTransformer(embedding_model, backend="onnx")
+        logger.info("ONNXバックエンドで埋め込みモデルを読み込みました")
+        return model
+    except Exception as e:
+        logger.info(f"ONNXバックエンドが利用できないためPyTorchで実行します: {str(e)}")
+        return SentenceTransformer(embedding_model)
+
+
 class VectorDatabase:
     """ベクトルデータベースの管理クラス"""
 
+    # コレクション作成時に適用するHNSWインデックスのパラメータ
+    # （挿入時にL2正規化するため、内積空間でのスコアはcosine類似度と一致し、
+    #   比較ごとのFLOPsはcosine計算の約1/3で済む。高めのconstruction_ef/Mで
+    #   大規模コーパスでも再現率を確保）
+    # search_efもここで固定する。chromadb 0.5.18のcollection.modifyは
+    # メタデータを丸ごと置き換える上、HNSWセグメントは作成時に取り込んだ
+    # パラメータをキャッシュし続けるため、後からの変更は反映されない
+    # （動的に変更したい場合はhnswlibバックエンドを使用する）
+    COLLECTION_METADATA = {
+        "description": "Security check Q&A database",
+        "hnsw:space": "ip",
+        "hnsw:construction_ef": 200,
+        "hnsw:M": 32,
+        "hnsw:search_ef": 64,
+    }
+
     def __init__(
         self,
         persist_directory: str = "./vectordb",
@@ -44,30 +127,113 @@ class VectorDatabase:
             path=persist_directory, settings=Settings(anonymized_telemetry=False)
         )
 
-        # 埋め込みモデルの読み込み
-        logger.info(f"埋め込みモデルを読み込み中: {embedding_model}")
-        self.embedding_model = SentenceTransformer(embedding_model)
+        # 埋め込みモデルの読み込み（プロセス内で共有されるシングルトン）
+        self.embedding_model = _load_embedding_model(embedding_model)
 
         # コレクションの取得または作成
         try:
             self.collection = self.client.get_collection(name=collection_name)
             logger.info(f"既存のコレクション '{collection_name}' を読み込みました")
+
+            # 旧バージョンが作成したコレクションはL2空間+未正規化ベクトルの
+            # まま残っており、現行の正規化挿入と 1 - distance のスコア変換では
+            # ランキングも閾値判定も意味を持たない。再構築されるまで明示的に警告する
+            existing_space = (self.collection.metadata or {}).get("hnsw:space")
+            expected_space = self.COLLECTION_METADATA["hnsw:space"]
+            if existing_space != expected_space:
+                logger.warning(
+                    f"コレクション '{collection_name}' は距離空間 "
+                    f"'{existing_space or 'l2'}' で作成されており、現行の設定 "
+                    f"'{expected_space}' と一致しません。検索スコアが正しく"
+                    "計算されないため、データベースの再構築"
+                    "（クリアしてdata/rawから再追加）が必要です"
+                )
         except:
             self.collection = self.client.create_collection(
                 name=collection_name,
-                metadata={"description": "Security check Q&A database"},
+                metadata=self.COLLECTION_METADATA,
             )
             logger.info(f"新しいコレクション '{collection_name}' を作成しました")
 
+        # 検索結果・クエリ埋め込みのLRU + TTLキャッシュ
+        # （Streamlitの再実行で同一クエリが繰り返し検索されるため）
+        self._result_cache = QueryCache(max_size=2000, ttl_seconds=600)
+        self._embedding_cache = QueryCache(max_size=2000, ttl_seconds=600)
+
+        # 内容アドレス型の永続埋め込みキャッシュ
+        # （data/raw再構築時などの同一ドキュメント再エンコードを回避）
+        self._persistent_cache = EmbeddingCache(
+            str(Path(persist_directory) / "embedding_cache.sqlite3"),
+            embedding_model,
+        )
+
+    def _encode_queries(self, queries: List[str]):
+        """クエリの埋め込みベクトルを生成（キャッシュ済みのものは再利用）"""
+        embeddings = [self._embedding_cache.get(q) for q in queries]
+
+        missing = [i for i, e in enumerate(embeddings) if e is None]
+        if missing:
+            # メモリキャッシュ未登録分は永続キャッシュを経由してエンコード
+            encoded = self._persistent_cache.get_or_compute_many(
+                [queries[i] for i in missing],
+                lambda texts: self.embedding_model.encode(
+                    texts,
+                    batch_size=64,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                ),
+            )
+            for idx, vector in zip(missing, encoded):
+                embeddings[idx] = vector
+                self._embedding_cache.put(queries[idx], vector)
+
+        return embeddings
+
+    def _encode_documents(self, documents: List[str]):
+        """ドキュメントの埋め込みベクトルを一括生成（L2正規化済み）
+
+        文字数順に並べ替えてからエンコードし、バッチ内のパディングを最小化する
+        （SBERTのsmart batching。長短が混在したバッチでは最長要素に合わせた
+        パディングトークン分のFLOPsが無駄になる）。結果は元の順序に戻して返す。
+        GPUが利用可能な場合はfp16のautocastでTensor Coreを使う。
+        """
+        import torch
+
+        # 文字数をトークン長の近似として昇順に並べ替え
+        order = np.argsort([len(d) for d in documents])
+        sorted_docs = [documents[i] for i in order]
+
+        encode_kwargs = dict(
+            batch_size=256,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+
+        if torch.cuda.is_available() and isinstance(
+            self.embedding_model, SentenceTransformer
+        ):
+            with torch.autocast(device_type="cuda", dtype=torch.float16):
+                embeddings = self.embedding_model.encode(
+                    sorted_docs, device="cuda", **encode_kwargs
+                )
+        else:
+            embeddings = self.embedding_model.encode(sorted_docs, **encode_kwargs)
+
+        # 並べ替えの逆置換で元の順序に戻す
+        return embeddings[np.argsort(order)]
+
     def add_qa_pairs(
-        self, qa_pairs: List[Dict[str, str]], batch_size: int = 100
+        self, qa_pairs: List[Dict[str, str]], batch_size: int = 10_000
     ) -> int:
         """
         Q&Aペアをベクトルデータベースに追加
 
         Args:
             qa_pairs: [{"question": "...", "answer": "...", "source": "..."}, ...]
-            batch_size: バッチサイズ
+            batch_size: collection.add 1回あたりの件数の上限。実際には
+                クライアントが報告する上限まで自動的に切り詰められる
 
         Returns:
             追加された件数
@@ -82,7 +248,7 @@ class VectorDatabase:
         metadatas = []
         ids = []
 
-        for i, qa in enumerate(qa_pairs):
+        for qa in qa_pairs:
             # 質問と回答を組み合わせたテキストを作成
             document = f"質問: {qa['question']}\n回答: {qa['answer']}"
             documents.append(document)
@@ -95,29 +261,53 @@ class VectorDatabase:
                 }
             )
 
-            # 既存のIDとの重複を避けるため、現在のカウントを取得
-            current_count = self.collection.count()
-            ids.append(f"qa_{current_count + i}")
-
-        # バッチ処理で追加
+            # 既存IDと衝突しないようUUIDで採番
+            # （count()ベースの連番はaddするまで値が進まず、再追加時に衝突する）
+            ids.append(f"qa_{uuid.uuid4().hex}")
+
+        # 埋め込みベクトルを全件まとめて生成（クエリ側と同様にL2正規化して格納）
+        # 100件ごとのencode()呼び出しではなく1回の呼び出しに大きなbatch_sizeを
+        # 渡し、モデル側でバッチ処理させる。GPUがあればfp16のautocastで実行。
+        # 永続キャッシュにあるドキュメントはエンコード自体をスキップ。
+        # 重複ドキュメント（複数ファイルに現れる定型FAQなど）は1回だけ
+        # エンコードし、逆引きインデックスで各行に展開する
+        unique_docs, inverse = np.unique(documents, return_inverse=True)
+        if len(unique_docs) < len(documents):
+            logger.info(
+                f"重複ドキュメントを検出: {len(documents)}件中{len(unique_docs)}件のみエンコード"
+            )
+        unique_embeddings = self._persistent_cache.get_or_compute_many(
+            unique_docs.tolist(), self._encode_documents
+        )
+        assert np.allclose(np.linalg.norm(unique_embeddings, axis=1), 1.0, atol=1e-3)
+
+        # float16化はしない: tolist()経由でChromaに渡った時点でfloat32として
+        # 格納される（hnswlibはfloat32のみ）ため節約にならず、丸め誤差だけが残る
+        embeddings = unique_embeddings[inverse]
+
+        # できるだけ大きな単位でまとめて追加し、Python→SQLiteの
+        # 書き込みトランザクション境界の回数を最小化する（従来の100件刻みでは
+        # 不要な往復が発生していた）。1回のaddで受け付けられる件数は
+        # SQLiteビルドのMAX_VARIABLE_NUMBERに依存する（素のビルドでは166、
+        # 拡張ビルドでは5461程度）ため、クライアントが報告する上限に切り詰める
+        batch_size = min(batch_size, self.client.get_max_batch_size())
+
+        # documentsは渡さない: 結合テキスト「質問: ... 回答: ...」はメタデータの
+        # question/answerから再構成できるため、二重に保存するとディスク使用量と
+        # SQLite書き込みがほぼ倍になる（search()はメタデータしか読まない）
         for i in range(0, len(documents), batch_size):
-            batch_docs = documents[i : i + batch_size]
-            batch_metas = metadatas[i : i + batch_size]
-            batch_ids = ids[i : i + batch_size]
-
-            # 埋め込みベクトルを生成
-            embeddings = self.embedding_model.encode(batch_docs).tolist()
-
-            # データベースに追加
             self.collection.add(
-                embeddings=embeddings,
-                documents=batch_docs,
-                metadatas=batch_metas,
-                ids=batch_ids,
+                embeddings=embeddings[i : i + batch_size].tolist(),
+                metadatas=metadatas[i : i + batch_size],
+                ids=ids[i : i + batch_size],
             )
 
             logger.info(f"進捗: {min(i + batch_size, len(documents))}/{len(documents)}")
 
+        # データが変わったため、キャッシュ済みの検索結果は無効化
+        self._result_cache.clear()
+        self._embedding_cache.clear()
+
         logger.info(f"{len(qa_pairs)}件のQ&Aペアを追加しました")
         return len(qa_pairs)
 
@@ -127,6 +317,9 @@ class VectorDatabase:
         """
         類似検索を実行
 
+        search_efはコレクション作成時にCOLLECTION_METADATAで固定される
+        （クエリごとの変更はhnswlibバックエンドのみ対応）。
+
         Args:
             query: 検索クエリ
             top_k: 返す結果の最大数
@@ -135,12 +328,18 @@ class VectorDatabase:
         Returns:
             [{"question": "...", "answer": "...", "source": "...", "score": 0.9}, ...]
         """
+        # キャッシュヒットなら検索を丸ごとスキップ
+        cache_key = (query, top_k, score_threshold)
+        cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         if self.collection.count() == 0:
             logger.warning("データベースが空です")
             return []
 
         # クエリの埋め込みベクトルを生成
-        query_embedding = self.embedding_model.encode(query).tolist()
+        query_embedding = self._encode_queries([query])[0].tolist()
 
         # 類似検索を実行
         results = self.collection.query(
@@ -166,9 +365,87 @@ class VectorDatabase:
                         }
                     )
 
+        self._result_cache.put(cache_key, search_results)
+
         logger.info(f"検索結果: {len(search_results)}件")
         return search_results
 
+    def batch_search(
+        self, queries: List[str], top_k: int = 5, score_threshold: float = 0.0
+    ) -> List[List[Dict]]:
+        """
+        複数クエリの類似検索を一括実行
+
+        埋め込み生成を1回の encode() にまとめることで、クエリ数が多い場合でも
+        モデルのフォワードパスをバッチ処理できる（1件ずつの search() より高速）。
+
+        Args:
+            queries: 検索クエリのリスト
+            top_k: クエリごとに返す結果の最大数
+            score_threshold: スコアの閾値（これ以上のスコアのみ返す）
+
+        Returns:
+            クエリごとの検索結果リスト（search() と同じ形式）
+        """
+        if not queries:
+            return []
+
+        if self.collection.count() == 0:
+            logger.warning("データベースが空です")
+            return [[] for _ in queries]
+
+        # キャッシュ済みのクエリは検索をスキップ
+        all_results: List[Optional[List[Dict]]] = [None] * len(queries)
+        pending = []
+        for i, query in enumerate(queries):
+            cached = self._result_cache.get((query, top_k, score_threshold))
+            if cached is not None:
+                all_results[i] = cached
+            else:
+                pending.append(i)
+
+        if pending:
+            # 未キャッシュ分の埋め込みを一括生成
+            query_embeddings = self._encode_queries([queries[i] for i in pending])
+
+            # ChromaDBは複数クエリベクトルを一度に受け付ける
+            results = self.collection.query(
+                query_embeddings=[e.tolist() for e in query_embeddings],
+                n_results=top_k,
+            )
+
+            # クエリごとに結果を整形
+            for qi, orig_i in enumerate(pending):
+                search_results = []
+
+                if results["metadatas"] and len(results["metadatas"][qi]) > 0:
+                    for i, metadata in enumerate(results["metadatas"][qi]):
+                        distance = results["distances"][qi][i]
+                        score = 1 - distance
+
+                        if score >= score_threshold:
+                            search_results.append(
+                                {
+                                    "question": metadata["question"],
+                                    "answer": metadata["answer"],
+                                    "source": metadata["source"],
+                                    "score": score,
+                                }
+                            )
+
+                all_results[orig_i] = search_results
+                self._result_cache.put(
+                    (queries[orig_i], top_k, score_threshold), search_results
+                )
+
+        logger.info(
+            f"一括検索完了: {len(queries)}件のクエリ（キャッシュヒット: {len(queries) - len(pending)}件）"
+        )
+        return all_results
+
+    # 別名（複数クエリの一括検索APIとしてどちらの名前でも呼び出せるように）
+    search_batch = batch_search
+
     def clear_database(self):
         """データベースをクリア"""
         try:
@@ -178,9 +455,12 @@ class VectorDatabase:
             # 再作成
             self.collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "Security check Q&A database"},
+                metadata=self.COLLECTION_METADATA,
             )
             logger.info(f"コレクション '{self.collection_name}' を再作成しました")
+
+            self._result_cache.clear()
+            self._embedding_cache.clear()
         except Exception as e:
             logger.error(f"データベースクリアエラー: {str(e)}")
 